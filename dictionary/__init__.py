@@ -0,0 +1,3 @@
+from .service import DictionaryService, WaniIndex, get_service
+
+__all__ = ["DictionaryService", "WaniIndex", "get_service"]
@@ -0,0 +1,23 @@
+import json
+import sys
+from typing import Any
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return tuple(sys.intern(v) for v in value)
+    return value
+
+
+def load_records(raw: str) -> list[dict]:
+    """
+    Decode `raw` json with every string interned and every list of strings frozen into a tuple
+
+    json.loads makes a new string for every occurrence, so readings,
+    meanings and vocab repeated across thousands of records are stored once
+    per occurrence. Interned, each distinct string is stored once and every
+    record shares a reference to it
+    """
+    return json.loads(raw, object_hook=lambda d: {k: _compact(v) for k, v in d.items()})
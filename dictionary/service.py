@@ -0,0 +1,248 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from os import path
+from time import monotonic
+from typing import Any, Optional
+
+import aiohttp
+
+from redbot.core.bot import Red
+
+from .interning import load_records
+
+JISHO_API_SEARCH = "http://jisho.org/api/v1/search/words"
+
+WANI_DATA_FILES = ("radicals.json", "kanji.json", "vocab.json")
+# Bump whenever WaniIndex gains or changes an index, so old snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = "wani_index.pickle"
+
+CACHE_SIZE = 256
+CACHE_TTL_S = 60 * 60
+
+_BOT_ATTR = "_chu2_dictionary_service"
+
+
+class ResponseCache:
+    """
+    Small LRU cache with a time to live for api responses
+    """
+
+    def __init__(self, size: int = CACHE_SIZE, ttl_s: float = CACHE_TTL_S) -> None:
+        self.size = size
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if monotonic() - stored_at > self.ttl_s:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self._entries[key] = (monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class WaniIndex:
+    """
+    WaniKani radicals, kanji and vocab keyed for constant time lookups
+    """
+
+    def __init__(self, radicals: list[dict], kanji: list[dict], vocab: list[dict]) -> None:
+        self.radicals = radicals
+        self.kanji = kanji
+        self.vocab = vocab
+        self.radicals_by_character: dict[str, dict] = {
+            r["character"]: r for r in radicals if r["character"]
+        }
+        self.radicals_by_name: dict[str, dict] = {
+            r["name"].lower(): r for r in radicals
+        }
+        self.kanji_by_character: dict[str, dict] = {
+            k["character"]: k for k in kanji
+        }
+        self.vocab_by_word: dict[str, dict] = {v["vocab"]: v for v in vocab}
+
+    @classmethod
+    def from_dir(cls, data_dir: str) -> "WaniIndex":
+        def _load(filename: str) -> list[dict]:
+            file_path = path.join(data_dir, filename)
+            if not path.isfile(file_path):
+                return []
+            with open(file_path, encoding="utf-8") as f:
+                return load_records(f.read())
+
+        return cls(*(_load(filename) for filename in WANI_DATA_FILES))
+
+    @staticmethod
+    def source_hash(data_dir: str) -> str:
+        digest = hashlib.sha256()
+        for filename in WANI_DATA_FILES:
+            digest.update(filename.encode("utf-8"))
+            file_path = path.join(data_dir, filename)
+            if path.isfile(file_path):
+                with open(file_path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, data_dir: str, snapshot_dir: str) -> "WaniIndex":
+        """
+        Bulk load the index from a snapshot in `snapshot_dir`
+        Rebuilds from `data_dir`, and rewrites the snapshot, when the snapshot is missing,
+        from another SNAPSHOT_VERSION, or built from different data files
+        """
+        source_hash = cls.source_hash(data_dir)
+        snapshot_path = path.join(snapshot_dir, SNAPSHOT_FILE)
+        try:
+            with open(snapshot_path, "rb") as f:
+                version, snapshot_hash, state = pickle.load(f)
+            if version == SNAPSHOT_VERSION and snapshot_hash == source_hash:
+                index = cls.__new__(cls)
+                index.__dict__.update(state)
+                return index
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Discarding unreadable snapshot {snapshot_path}: {e}")
+
+        index = cls.from_dir(data_dir)
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            tmp_path = f"{snapshot_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    (SNAPSHOT_VERSION, source_hash, index.__dict__),
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, snapshot_path)
+        except OSError as e:
+            print(f"Could not write snapshot {snapshot_path}: {e}")
+        return index
+
+
+class DictionaryService:
+    """
+    Dictionary data shared by every cog that registers with it
+
+    Holds one copy of the WaniKani index, one aiohttp session and one
+    response cache per bot, no matter how many cogs use them
+    """
+
+    def __init__(self, bot: Red) -> None:
+        self.bot = bot
+        self.cache = ResponseCache()
+        self.wani: Optional[WaniIndex] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cogs: set[str] = set()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def register(self, cog_name: str) -> None:
+        self._cogs.add(cog_name)
+
+    def unregister(self, cog_name: str) -> None:
+        """
+        Remove `cog_name`, tearing the service down once no cog uses it
+        """
+        self._cogs.discard(cog_name)
+        if cog_name == "WaniCog":
+            self.wani = None
+        if not self._cogs:
+            if self._session is not None:
+                self.bot.loop.create_task(self._session.close())
+                self._session = None
+            self.cache.clear()
+            if getattr(self.bot, _BOT_ATTR, None) is self:
+                delattr(self.bot, _BOT_ATTR)
+
+    def load_wani(self, data_dir: str, snapshot_dir: Optional[str] = None) -> WaniIndex:
+        """
+        Load the WaniKani index once, warm starting from a snapshot in `snapshot_dir` if given
+        """
+        if self.wani is None:
+            if snapshot_dir is None:
+                self.wani = WaniIndex.from_dir(data_dir)
+            else:
+                self.wani = WaniIndex.load(data_dir, snapshot_dir)
+        return self.wani
+
+    def find_radical(self, query: str) -> Optional[dict]:
+        if self.wani is None:
+            return None
+        if len(query) > 1:
+            return self.wani.radicals_by_name.get(query.lower())
+        return self.wani.radicals_by_character.get(query)
+
+    def find_kanji(self, character: str) -> Optional[dict]:
+        if self.wani is None:
+            return None
+        return self.wani.kanji_by_character.get(character)
+
+    def find_vocab(self, word: str) -> Optional[dict]:
+        if self.wani is None:
+            return None
+        return self.wani.vocab_by_word.get(word)
+
+    async def search_jisho(self, query: str) -> list:
+        """
+        Search jisho.org for `query`, answering repeated queries from the cache
+        """
+        key = f"jisho:{query}"
+        if (results := self.cache.get(key)) is not None:
+            return results
+        async with self.session.get(JISHO_API_SEARCH, params={"keyword": query}) as r:
+            results = (await r.json()).get("data", [])
+        self.cache.put(key, results)
+        return results
+
+    def wani_details(self, word: str) -> dict:
+        """
+        WaniKani vocab entry for `word` and the kanji it is written with
+        """
+        kanji = []
+        for character in dict.fromkeys(word):
+            if (entry := self.find_kanji(character)) is not None:
+                kanji.append(entry)
+        return {"vocab": self.find_vocab(word), "kanji": kanji}
+
+    async def search_enriched(self, query: str) -> list:
+        """
+        Search jisho.org and attach WaniKani level and mnemonics to each result under "wanikani"
+        """
+        results = await self.search_jisho(query)
+        enriched = []
+        for result in results:
+            forms = result.get("japanese", [])
+            word = next((f["word"] for f in forms if f.get("word")), "")
+            enriched.append({**result, "wanikani": self.wani_details(word)})
+        return enriched
+
+
+def get_service(bot: Red) -> DictionaryService:
+    """
+    Return the dictionary service for `bot`, creating it on first use
+    """
+    service = getattr(bot, _BOT_ATTR, None)
+    if service is None:
+        service = DictionaryService(bot)
+        setattr(bot, _BOT_ATTR, service)
+    return service
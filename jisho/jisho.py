@@ -4,9 +4,6 @@
 from typing import Literal
 from urllib.parse import quote as urlquote
 
-# External Lib
-import aiohttp
-
 # Discord
 import discord
 
@@ -17,11 +14,13 @@ from redbot.core.config import Config
 from redbot.core.utils import menus
 from redbot.core.utils.predicates import ReactionPredicate
 
+# Shared
+from dictionary import get_service
+
 RequestType = Literal["discord_deleted_user", "owner", "user", "user_strict"]
 
 
 JISHO_COG_ID = 3245301569410685578 # Random 64 bit number
-JISHO_API_SEARCH = "http://jisho.org/api/v1/search/words"
 
 
 EMBED_COLOR_JISHO = 0x3edd00
@@ -31,7 +30,8 @@ EMBED_THUMBNAIL_JISHO = 'https://assets.jisho.org/assets/touch-icon-017b99ca4bfd
 class JishoCog(commands.Cog):    
     def __init__(self, bot: Red) -> None:
         self.bot = bot
-        self.session = aiohttp.ClientSession()
+        self.dictionary = get_service(bot)
+        self.dictionary.register(self.qualified_name)
         self.config = Config.get_conf(
             self,
             identifier=JISHO_COG_ID,
@@ -43,7 +43,7 @@ class JishoCog(commands.Cog):
         self.config.register_global(**default_global)
 
     def cog_unload(self) -> None:
-        self.bot.loop.create_task(self.session.close())
+        self.dictionary.unregister(self.qualified_name)
 
     async def red_delete_data_for_user(self, *, requester: RequestType, user_id: int) -> None:
         super().red_delete_data_for_user(requester=requester, user_id=user_id)
@@ -69,6 +69,22 @@ class JishoCog(commands.Cog):
             else:
                 return form['reading']
 
+        def _wani_level(result: dict) -> str:
+            """
+            Helper method to return the WaniKani level of a result, if WaniKani teaches it
+            :param result: jisho.org result enriched by the dictionary service
+            :return: string with the WaniKani level, or an empty string
+            """
+            wanikani = result.get('wanikani', {})
+            # Kanji merged in from KANJIDIC have no WaniKani level
+            kanji_levels = [k['level'] for k in wanikani.get('kanji', []) if k['level'] is not None]
+            if wanikani.get('vocab'):
+                return ' · WaniKani level {level}'.format(level=wanikani['vocab']['level'])
+            elif kanji_levels:
+                return ' · WaniKani level {level}'.format(level=max(kanji_levels))
+            else:
+                return ''
+
         results_per_page = await self.config.results_per_page()
 
         pages = []
@@ -99,7 +115,7 @@ class JishoCog(commands.Cog):
             readings = result.get('japanese', [])
             readable_word = _form_readable(readings[0])
 
-            embed.add_field(name=emoji, value=readable_word, inline=False)
+            embed.add_field(name=emoji, value=readable_word + _wani_level(result), inline=False)
 
         if embed is None:
             embed = default_embed.copy()
@@ -118,9 +134,7 @@ class JishoCog(commands.Cog):
         Searches jisho.org for `query`
         """
         # Build embed, send message, add reactions
-        results = []
-        async with self.session.get(JISHO_API_SEARCH, params={"keyword": query}) as r:
-            results = (await r.json()).get('data', [])
+        results = await self.dictionary.search_enriched(query)
 
         pages = await self._command_search_pages(query, results)
 
@@ -132,9 +146,7 @@ class JishoCog(commands.Cog):
         Shows details for the `num`th result for `query`
         """
         # Build embed, send message, add reactions
-        results = []
-        async with self.session.get(JISHO_API_SEARCH, params={"keyword": query}) as r:
-            results = (await r.json()).get('data', [])
+        results = await self.dictionary.search_enriched(query)
 
         pages = await self._command_search_pages(query, results)
 
@@ -1,12 +1,16 @@
+import argparse
 import codecs
 import hashlib
 import os
+import queue
 import re
+import sqlite3
 import sys
+import threading
 import urllib.request
 from os import name, path
-from time import sleep
-from typing import Optional
+from time import monotonic, perf_counter, sleep
+from typing import Iterable, Iterator, Optional
 
 import jsonpickle
 from bs4 import BeautifulSoup
@@ -15,25 +19,46 @@ from bs4.element import Tag
 jsonpickle.set_encoder_options("json", ensure_ascii=False)
 
 
+class RateLimiter:
+    """
+    Space requests `interval_s` apart across every crawl thread
+    """
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self._lock = threading.Lock()
+        self._next_s = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = monotonic()
+            delay = self._next_s - now
+            self._next_s = max(now, self._next_s) + self.interval_s
+        if delay > 0:
+            sleep(delay)
+
+
 class const:
     rate_limit_s: int = 2
+    rate_limiter: RateLimiter = RateLimiter(rate_limit_s)
+    base_url: str = "https://www.wanikani.com"
     cache_dir: str = path.join(path.dirname(__file__), "cache")
 
 
 def download_kani(url: str) -> Optional[BeautifulSoup]:
     """
     Download page from Wanikani
-    There is a builtin sleep due to rate limiting from Wanikani
+    Downloads are spaced out by const.rate_limiter due to rate limiting from Wanikani
     """
     print(f"Searching cache for {url}")
     if (cache := search_cache(url)) is None:
         print(f"Downloading {url}")
         if url[0] == "/":
-            wani_url = f"https://wanikani.com{url}"
+            wani_url = f"{const.base_url}{url}"
         else:
             wani_url = url
+        const.rate_limiter.wait()
         response = urllib.request.urlopen(wani_url)
-        sleep(const.rate_limit_s)
         if response is None or response == "":
             return None
         html = response.read()
@@ -192,7 +217,7 @@ def search_cache(url: str) -> Optional[str]:
     downloaded for a specific endpoint
     """
     if not path.exists(const.cache_dir):
-        os.mkdir(const.cache_dir)
+        os.makedirs(const.cache_dir, exist_ok=True)
         return None
     url_path = cache_file(url)
     if path.isfile(url_path):
@@ -212,7 +237,7 @@ def get_level_html(level: int) -> Optional[BeautifulSoup]:
     if level < 1 or level > 60:
         return None
 
-    endpoint = f"https://www.wanikani.com/level/{level}"
+    endpoint = f"{const.base_url}/level/{level}"
     return download_kani(endpoint)
 
 
@@ -368,71 +393,284 @@ def parse_vocab_soup(vocab_soup: BeautifulSoup) -> Vocab:
     )
 
 
-def parse_level_soup(level_html: BeautifulSoup, level: int) -> WaniLevel:
+LEVEL_ITEM_CLASSES = {
+    "radical": re.compile(r"radical-[0-9]+"),
+    "kanji": re.compile(r"kanji-[0-9]+"),
+    "vocab": re.compile(r"vocabulary-[0-9]+"),
+}
+
+
+def iter_level_items(level_html: BeautifulSoup, level: int) -> Iterator[tuple[str, LevelItem]]:
     """
-    Parse WaniKani level page html to get radicals, kanji, and vocab and the url to their page
+    Yield (kind, item) for every radical, kanji, and vocab on a WaniKani level page as it is found
     """
-    radicals: list[LevelItem] = []
-    kanji: list[LevelItem] = []
-    vocab: list[LevelItem] = []
-
-    radical_lis = level_html.find_all(
-        "li", {"class": re.compile(r"radical-[0-9]+")})
-    kanji_lis = level_html.find_all(
-        "li", {"class": re.compile(r"kanji-[0-9]+")})
-    vocab_lis = level_html.find_all(
-        "li", {"class": re.compile(r"vocabulary-[0-9]+")})
-
-    def add_to_list(lis: list[Tag], l: list[LevelItem]) -> None:
-        for li in lis:
+    for kind, li_class in LEVEL_ITEM_CLASSES.items():
+        for li in level_html.find_all("li", {"class": li_class}):
             href = li.find("a").attrs["href"]
             character = li.find(
                 "span", {"class": "character", "lang": "ja"}
             ).text.strip()
-            l.append(LevelItem(character, href, level))
+            yield kind, LevelItem(character, href, level)
+
+
+def parse_level_soup(level_html: BeautifulSoup, level: int) -> WaniLevel:
+    """
+    Parse WaniKani level page html to get radicals, kanji, and vocab and the url to their page
+    """
+    items: dict[str, list[LevelItem]] = {kind: [] for kind in LEVEL_ITEM_CLASSES}
+    for kind, item in iter_level_items(level_html, level):
+        items[kind].append(item)
 
     print(
-        f"{len(radical_lis)} radicals, {len(kanji_lis)} kanji, {len(vocab_lis)} vocab  found"
+        f"{len(items['radical'])} radicals, {len(items['kanji'])} kanji, {len(items['vocab'])} vocab  found"
     )
 
-    add_to_list(radical_lis, radicals)
-    add_to_list(kanji_lis, kanji)
-    add_to_list(vocab_lis, vocab)
+    return WaniLevel(items["radical"], items["kanji"], items["vocab"])
+
 
-    return WaniLevel(radicals, kanji, vocab)
+ITEM_PARSERS = {
+    "radical": parse_radical_soup,
+    "kanji": parse_kanji_soup,
+    "vocab": parse_vocab_soup,
+}
+
+
+class CrawlJournal:
+    """
+    SQLite journal of crawl progress so an interrupted crawl resumes where it stopped
+    Level pages and item pages move through pending -> fetched -> parsed, or failed with a retry count
+    Parsed items keep their encoded result, so a rerun only parses failed or new items
+    """
+
+    PENDING = "pending"
+    FETCHED = "fetched"
+    PARSED = "parsed"
+    FAILED = "failed"
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS levels (
+                    level INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                );
+                CREATE TABLE IF NOT EXISTS items (
+                    url TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    character TEXT NOT NULL,
+                    level INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    result TEXT
+                );
+                CREATE INDEX IF NOT EXISTS items_level ON items (level, position);
+                """
+            )
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock, self._db:
+            return self._db.execute(sql, params).fetchall()
+
+    def level_state(self, level: int) -> Optional[tuple[str, int]]:
+        rows = self._execute(
+            "SELECT state, retries FROM levels WHERE level = ?", (level,))
+        return rows[0] if rows else None
+
+    def set_level_state(self, level: int, url: str, state: str, error: str = None) -> None:
+        self._execute(
+            """
+            INSERT INTO levels (level, url, state, retries, error) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (level) DO UPDATE SET
+                state = excluded.state,
+                retries = retries + excluded.retries,
+                error = excluded.error
+            """,
+            (level, url, state, int(state == CrawlJournal.FAILED), error),
+        )
+
+    def add_item(self, kind: str, item: LevelItem, position: int) -> tuple[str, int]:
+        """
+        Record `item` as pending unless it is already journaled, and return its state and retries
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                INSERT OR IGNORE INTO items (url, kind, character, level, position, state)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (item.url, kind, item.character, item.level,
+                 position, CrawlJournal.PENDING),
+            )
+            return self._db.execute(
+                "SELECT state, retries FROM items WHERE url = ?", (item.url,)
+            ).fetchone()
+
+    def unfinished_items(self, level: int, max_retries: int) -> list[tuple[str, LevelItem]]:
+        rows = self._execute(
+            """
+            SELECT kind, character, url, level FROM items
+            WHERE level = ? AND state != ? AND retries < ?
+            ORDER BY position
+            """,
+            (level, CrawlJournal.PARSED, max_retries),
+        )
+        return [(kind, LevelItem(character, url, level)) for kind, character, url, level in rows]
+
+    def set_item_state(self, url: str, state: str, error: str = None, result: str = None) -> None:
+        self._execute(
+            "UPDATE items SET state = ?, retries = retries + ?, error = ?, result = ? WHERE url = ?",
+            (state, int(state == CrawlJournal.FAILED), error, result, url),
+        )
+
+    def results(self, kind: str) -> list[str]:
+        return [
+            result
+            for (result,) in self._execute(
+                "SELECT result FROM items WHERE kind = ? AND state = ? ORDER BY level, position",
+                (kind, CrawlJournal.PARSED),
+            )
+        ]
+
+    def summary(self) -> dict[str, int]:
+        return dict(self._execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def crawl(
+    levels: Iterable[int],
+    journal: CrawlJournal,
+    workers: int = 4,
+    queue_size: int = 64,
+    max_retries: int = 3,
+) -> dict[str, list[str]]:
+    """
+    Crawl `levels` as a producer/consumer pipeline
+    A producer streams items off level pages into a bounded queue, `workers` threads
+    fetch and parse item pages across levels, and a writer thread records the results in `journal`
+    Anything already parsed in `journal` is skipped, and anything that failed `max_retries` times is given up on
+    Returns the encoded radicals, kanji, and vocab in level page order
+    """
+    items: queue.Queue = queue.Queue(maxsize=queue_size)
+    parsed: queue.Queue = queue.Queue()
+
+    def crawl_level(level: int) -> None:
+        state = journal.level_state(level)
+        if state is not None and state[0] == CrawlJournal.PARSED:
+            for kind, item in journal.unfinished_items(level, max_retries):
+                items.put((kind, item))
+            return
+        if state is not None and state[1] >= max_retries:
+            print(f"Giving up on level {level} after {state[1]} failures")
+            return
+
+        url = f"{const.base_url}/level/{level}"
+        try:
+            level_html = get_level_html(level)
+            if level_html is None:
+                raise ValueError("did not get html")
+            for position, (kind, item) in enumerate(iter_level_items(level_html, level)):
+                item_state, retries = journal.add_item(kind, item, position)
+                if item_state != CrawlJournal.PARSED and retries < max_retries:
+                    items.put((kind, item))
+        except Exception as e:
+            print(f"Failed to crawl level {level}: {e}")
+            journal.set_level_state(level, url, CrawlJournal.FAILED, repr(e))
+        else:
+            journal.set_level_state(level, url, CrawlJournal.PARSED)
+
+    def produce() -> None:
+        for level in levels:
+            crawl_level(level)
+        for _ in range(workers):
+            items.put(None)
+
+    def work() -> None:
+        while (job := items.get()) is not None:
+            kind, item = job
+            try:
+                soup = item.get_soup()
+                if soup is None:
+                    raise ValueError("did not get html")
+                journal.set_item_state(item.url, CrawlJournal.FETCHED)
+                parsed.put((item, ITEM_PARSERS[kind](soup)))
+            except Exception as e:
+                print(f"Failed to crawl {item.url}: {e}")
+                journal.set_item_state(item.url, CrawlJournal.FAILED, repr(e))
+
+    def write() -> None:
+        while (result := parsed.get()) is not None:
+            item, obj = result
+            journal.set_item_state(
+                item.url,
+                CrawlJournal.PARSED,
+                result=jsonpickle.encode(obj, unpicklable=False),
+            )
+
+    producer = threading.Thread(target=produce, daemon=True)
+    consumers = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    writer = threading.Thread(target=write, daemon=True)
+    for thread in [producer, writer, *consumers]:
+        thread.start()
+    producer.join()
+    for thread in consumers:
+        thread.join()
+    parsed.put(None)
+    writer.join()
+
+    return {kind: journal.results(kind) for kind in ITEM_PARSERS}
+
+
+def write_results(results: dict[str, list[str]], out_dir: str) -> None:
+    for kind, filename in (
+        ("radical", "radicals.json"),
+        ("kanji", "kanji.json"),
+        ("vocab", "vocab.json"),
+    ):
+        with codecs.open(path.join(out_dir, filename), "w", "utf-8") as f:
+            f.write(f"[{', '.join(results[kind])}]")
 
 
 if __name__ == "__main__":
-    radicals: list[Radical] = []
-    kanji: list[Kanji] = []
-    vocab: list[Vocab] = []
-    for level in range(1, 61):
-        html = get_level_html(level)
-        if html is None:
-            print("Did not get html")
-        parsed = parse_level_soup(html, level)
-        for v in parsed.vocab:
-            vocab_html = v.get_soup()
-            if vocab_html is None:
-                continue
-            vocab.append(parse_vocab_soup(vocab_html))
-
-        for r in parsed.radicals:
-            radical_html = r.get_soup()
-            if radical_html is None:
-                continue
-            radicals.append(parse_radical_soup(radical_html))
-
-        for k in parsed.kanji:
-            kanji_soup = k.get_soup()
-            if kanji_soup is None:
-                continue
-            kanji.append(parse_kanji_soup(kanji_soup))
-
-    with codecs.open(path.join(const.cache_dir, "radicals.json"), "w", "utf-8") as f:
-        f.write(jsonpickle.encode(radicals, unpicklable=False))
-
-    with codecs.open(path.join(const.cache_dir, "kanji.json"), "w", "utf-8") as f:
-        f.write(jsonpickle.encode(kanji, unpicklable=False))
-    with codecs.open(path.join(const.cache_dir, "vocab.json"), "w", "utf-8") as f:
-        f.write(jsonpickle.encode(vocab, unpicklable=False))
+    parser = argparse.ArgumentParser(description="Crawl WaniKani levels")
+    parser.add_argument("--levels", type=int, nargs=2, default=(1, 60), metavar=("FIRST", "LAST"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--base-url", default=const.base_url)
+    parser.add_argument("--rate-limit", type=float, default=const.rate_limit_s)
+    parser.add_argument("--journal", default=path.join(const.cache_dir, "crawl.sqlite3"))
+    parser.add_argument("--max-retries", type=int, default=3)
+    args = parser.parse_args()
+
+    const.base_url = args.base_url
+    const.rate_limit_s = args.rate_limit
+    const.rate_limiter = RateLimiter(args.rate_limit)
+
+    os.makedirs(const.cache_dir, exist_ok=True)
+    journal = CrawlJournal(args.journal)
+    start = perf_counter()
+    try:
+        results = crawl(
+            range(args.levels[0], args.levels[1] + 1),
+            journal,
+            args.workers,
+            args.queue_size,
+            args.max_retries,
+        )
+        write_results(results, const.cache_dir)
+        print(f"Journal: {journal.summary()}")
+    finally:
+        journal.close()
+    print(
+        f"Crawled {len(results['radical'])} radicals, {len(results['kanji'])} kanji, "
+        f"{len(results['vocab'])} vocab in {perf_counter() - start:.2f}s"
+    )
@@ -0,0 +1,169 @@
+import codecs
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+from os import path
+from typing import Iterator, Optional
+
+
+class const:
+    kanji_json: str = path.join(path.dirname(__file__), "..", "kanji.json")
+    cache_dir: str = path.join(path.dirname(__file__), "cache")
+
+
+class KanjidicEntry:
+    def __init__(self, character: str):
+        self.character = character
+        self.stroke_count: Optional[int] = None
+        self.grade: Optional[int] = None
+        self.jlpt: Optional[int] = None
+        self.frequency: Optional[int] = None
+        self.meanings: list[str] = []
+        self.onyomi: list[str] = []
+        self.kunyomi: list[str] = []
+        self.nanori: list[str] = []
+
+    def __str__(self) -> str:
+        return f"[Kanjidic][{self.stroke_count}]{self.character}: {', '.join(self.meanings)}"
+
+
+def katakana_to_hiragana(reading: str) -> str:
+    """
+    KANJIDIC writes on'yomi in katakana, WaniKani writes them in hiragana
+    """
+    return "".join(
+        chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in reading
+    )
+
+
+def kun_stem(reading: str) -> str:
+    """
+    Strip the okurigana and affix markers KANJIDIC puts on kun'yomi (e.g. "-あ.げる" -> "あ")
+    """
+    return reading.split(".")[0].strip("-")
+
+
+def _int_or_none(text: Optional[str]) -> Optional[int]:
+    return int(text) if text is not None and text.strip() else None
+
+
+def _append_unique(l: list[str], value: str) -> None:
+    if value and value not in l:
+        l.append(value)
+
+
+def parse_character(elem: ET.Element) -> KanjidicEntry:
+    entry = KanjidicEntry(elem.findtext("literal"))
+
+    misc = elem.find("misc")
+    if misc is not None:
+        # The first stroke_count is the accepted one, any others are common miscounts
+        entry.stroke_count = _int_or_none(misc.findtext("stroke_count"))
+        entry.grade = _int_or_none(misc.findtext("grade"))
+        entry.jlpt = _int_or_none(misc.findtext("jlpt"))
+        entry.frequency = _int_or_none(misc.findtext("freq"))
+
+    reading_meaning = elem.find("reading_meaning")
+    if reading_meaning is not None:
+        for rmgroup in reading_meaning.iter("rmgroup"):
+            for reading in rmgroup.iter("reading"):
+                r_type = reading.get("r_type")
+                if r_type == "ja_on":
+                    _append_unique(entry.onyomi, katakana_to_hiragana(reading.text))
+                elif r_type == "ja_kun":
+                    _append_unique(entry.kunyomi, kun_stem(reading.text))
+            for meaning in rmgroup.iter("meaning"):
+                # Meanings without m_lang are English
+                if meaning.get("m_lang") is None:
+                    _append_unique(entry.meanings, meaning.text)
+        for nanori in reading_meaning.iter("nanori"):
+            _append_unique(entry.nanori, nanori.text)
+
+    return entry
+
+
+def iter_kanjidic(xml_path: str) -> Iterator[KanjidicEntry]:
+    """
+    Stream <character> entries out of a KANJIDIC2 dump
+    Every finished entry is cleared from the tree so memory stays flat on the full file
+    """
+    context = ET.iterparse(xml_path, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event == "end" and elem.tag == "character":
+            yield parse_character(elem)
+            root.clear()
+
+
+def kanjidic_fields(entry: KanjidicEntry) -> dict:
+    return {
+        "stroke_count": entry.stroke_count,
+        "grade": entry.grade,
+        "jlpt": entry.jlpt,
+        "frequency": entry.frequency,
+    }
+
+
+def kanjidic_only_record(entry: KanjidicEntry) -> dict:
+    """
+    Build a kanji.json record, in the shape kani_crawl writes, for a kanji WaniKani does not teach
+    """
+    name = entry.meanings[0].capitalize() if entry.meanings else ""
+    return {
+        "character": entry.character,
+        "name": name,
+        "radical_combinarion": [],
+        "meaning": {
+            "primary": name,
+            "alternatives": [m.capitalize() for m in entry.meanings[1:]],
+            "mnemonic": "",
+        },
+        "readings": {
+            "onyomi": entry.onyomi,
+            "kunyomi": entry.kunyomi,
+            "nanori": entry.nanori,
+            "mnemonic": "",
+        },
+        "found_in_vocabulary": [],
+        "level": None,
+        **kanjidic_fields(entry),
+    }
+
+
+def merge_kanjidic(kanji: list[dict], entries: Iterator[KanjidicEntry]) -> list[dict]:
+    """
+    Merge KANJIDIC entries into WaniKani kanji records
+    WaniKani records keep their data and gain the KANJIDIC fields, every other kanji is appended
+    Records from a previous merge (level None) are rebuilt so the import can be rerun
+    """
+    wani_kanji = [k for k in kanji if k["level"] is not None]
+    by_character = {k["character"]: k for k in wani_kanji}
+    merged = list(wani_kanji)
+    for entry in entries:
+        if (record := by_character.get(entry.character)) is not None:
+            record.update(kanjidic_fields(entry))
+        else:
+            merged.append(kanjidic_only_record(entry))
+    return merged
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} kanjidic2.xml [kanji.json] [output.json]")
+        sys.exit(1)
+    xml_path = sys.argv[1]
+    kanji_path = sys.argv[2] if len(sys.argv) > 2 else const.kanji_json
+    out_path = (
+        sys.argv[3] if len(sys.argv) > 3 else path.join(const.cache_dir, "kanji.json")
+    )
+
+    with codecs.open(kanji_path, "r", "utf-8") as f:
+        kanji: list[dict] = json.loads(f.read())
+
+    merged = merge_kanjidic(kanji, iter_kanjidic(xml_path))
+    print(f"{len(kanji)} WaniKani kanji, {len(merged)} kanji after merge")
+
+    os.makedirs(path.dirname(out_path) or ".", exist_ok=True)
+    with codecs.open(out_path, "w", "utf-8") as f:
+        f.write(json.dumps(merged, ensure_ascii=False))
@@ -1,15 +1,15 @@
 from typing import Any, Optional, Literal, List
 import discord
 
-import aiohttp
-
 from redbot.core import commands
 from redbot.core.bot import Red
 from redbot.core.config import Config
-import json
+from redbot.core.data_manager import cog_data_path
 import os
 from os import path
 
+from dictionary import get_service
+
 RequestType = Literal["discord_deleted_user", "owner", "user", "user_strict"]
 
 WANI_COG_ID = 4669677326061720122
@@ -42,18 +42,30 @@ def radical_embed(radical_entry: dict) -> discord.Embed:
 def kanji_embed(kanji_entry: dict) -> discord.Embed:
     character: str = kanji_entry["character"]
     primary: str = kanji_entry["name"]
-    alternatives: list[str] = kanji_entry["meaning"]["alternatives"]
-    onyomi: list[str] = kanji_entry["readings"]["onyomi"]
-    kunyomi: list[str] = kanji_entry["readings"]["kunyomi"]
-    level: int = kanji_entry["level"]
+    alternatives: tuple[str, ...] = kanji_entry["meaning"]["alternatives"]
+    onyomi: tuple[str, ...] = kanji_entry["readings"]["onyomi"]
+    kunyomi: tuple[str, ...] = kanji_entry["readings"]["kunyomi"]
+    level: Optional[int] = kanji_entry["level"]
+
+    # Fields merged in from KANJIDIC by scraping/kanjidic_import.py
+    kanjidic: list[str] = [
+        f"{label}: {kanji_entry[key]}"
+        for label, key in (
+            ("Strokes", "stroke_count"),
+            ("Grade", "grade"),
+            ("JLPT", "jlpt"),
+            ("Frequency", "frequency"),
+        )
+        if kanji_entry.get(key) is not None
+    ]
 
     return discord.Embed(
         title=f"Kanji: {character} | {primary}",
         description=(
             f"""
-            Level: {level}{f"{os.linesep}Alternative Meanings: {', '.join(alternatives)}" if len(alternatives) > 0 else ""}
+            Level: {level if level is not None else "Not on WaniKani"}{f"{os.linesep}Alternative Meanings: {', '.join(alternatives)}" if len(alternatives) > 0 else ""}
             On’yomi: {', '.join(onyomi)}
-            Kun’yomi: {', '.join(kunyomi)}
+            Kun’yomi: {', '.join(kunyomi)}{f"{os.linesep}{' | '.join(kanjidic)}" if len(kanjidic) > 0 else ""}
             """
         ),
         color=KANJI_COLOR
@@ -65,7 +77,7 @@ def vocab_embed(vocab_entry: dict) -> discord.Embed:
     level: int = vocab_entry["level"]
     reading: str = vocab_entry["reading"]["reading"]
     primary: str = vocab_entry["meaning"]["primary"]
-    alternatives: list[str] = vocab_entry["meaning"]["alternatives"]
+    alternatives: tuple[str, ...] = vocab_entry["meaning"]["alternatives"]
 
     return discord.Embed(
         title=f"Vocab: {vocab} | {reading}",
@@ -81,23 +93,19 @@ def vocab_embed(vocab_entry: dict) -> discord.Embed:
 
 class WaniCog(commands.Cog):
     def __init__(self, bot: Red) -> None:
-        self.bot = Red
-        self.session = aiohttp.ClientSession()
+        self.bot = bot
         self.config = Config.get_conf(
             self,
             identifier=WANI_COG_ID,
             force_registration=True
         )
         cog_path = path.realpath(path.dirname(__file__))
-        with open(path.join(cog_path, "radicals.json")) as f:
-            self.radicals = json.loads(f.read())
-        with open(path.join(cog_path, "kanji.json")) as f:
-            self.kanji = json.loads(f.read())
-        with open(path.join(cog_path, "vocab.json")) as f:
-            self.vocab = json.loads(f.read())
+        self.dictionary = get_service(bot)
+        self.dictionary.register(self.qualified_name)
+        self.dictionary.load_wani(cog_path, str(cog_data_path(self)))
 
-    def cofg_unload(self) -> None:
-        self.bot.loop.create_task(self.session.close())
+    def cog_unload(self) -> None:
+        self.dictionary.unregister(self.qualified_name)
 
     async def red_delete_data_for_user(self, *, requester: RequestType, user_id: int) -> None:
         super().red_delete_data_for_user(requester=requester, user_id=user_id)
@@ -116,18 +124,11 @@ class WaniCog(commands.Cog):
         if len(radical) < 1:
             embed = error_embed("Invalid query", "No radical provided")
         else:
-            try:
-                if len(radical) > 1:
-                    embed = radical_embed(next(
-                        r for r in self.radicals if r["name"].lower() == radical.lower()
-                    ))
-                else:
-                    embed = radical_embed(next(
-                        r for r in self.radicals if r["character"] == radical
-                    ))
-            except Exception as e:
-                print(e)
+            entry = self.dictionary.find_radical(radical)
+            if entry is None:
                 embed = error_embed(f"{radical} not found")
+            else:
+                embed = radical_embed(entry)
         await ctx.send(embed=embed)
 
     @wani.command(aliases=["k"])
@@ -142,12 +143,11 @@ class WaniCog(commands.Cog):
         else:
             if len(kanji) > 1:
                 kanji = kanji[0]
-            try:
-                embed = kanji_embed(next(
-                    k for k in self.kanji if k["character"] == kanji))
-            except Exception as e:
-                print(e)
+            entry = self.dictionary.find_kanji(kanji)
+            if entry is None:
                 embed = error_embed(f"{kanji} not found")
+            else:
+                embed = kanji_embed(entry)
 
         await ctx.send(embed=embed)
 
@@ -160,12 +160,10 @@ class WaniCog(commands.Cog):
         if len(vocab) == 0:
             embed = error_embed("Invalid query", "No vocab provided")
         else:
-            try:
-                embed = vocab_embed(next(
-                    v for v in self.vocab if v["vocab"] == vocab
-                ))
-            except Exception as e:
-                print(e)
+            entry = self.dictionary.find_vocab(vocab)
+            if entry is None:
                 embed = error_embed(f"{vocab} not found")
+            else:
+                embed = vocab_embed(entry)
 
         await ctx.send(embed=embed)